@@ -1,45 +1,121 @@
 from __future__ import annotations
-import os, json, argparse, time
-from typing import List, Dict
+import os, sys, io, json, argparse, time, random, threading, functools, hashlib
+from typing import List, Dict, Callable, Tuple
 from datetime import timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 
-from dateutil import parser as dateparser, tz
 from dotenv import load_dotenv
-import google.generativeai as genai
 
-# Gmail imports
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+# Gmail, Gemini, dateutil, asyncio and concurrent.futures are imported where used,
+# so startup only pays for what a run touches (google.generativeai alone is ~0.5s).
+from googleapiclient.errors import HttpError
+
+# orjson is optional; stdlib json keeps the same compact format without it
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+# pyahocorasick is optional; only used when several substrings are matched at once
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# fcntl is POSIX-only; token.json writes go unlocked elsewhere
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Silence gRPC debug logs (Gemini SDK internal)
 os.environ["GRPC_VERBOSITY"] = "ERROR"
 os.environ["GRPC_LOG_SEVERITY_LEVEL"] = "ERROR"
 
+# summary.md and the summary cache live here, no matter where the script is run from
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
 # Gmail read-only scope
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-# Load environment (.env) and set Gemini key and
+# Local archive: one JSON email per line, appended on each fetch
+EMAILS_FILE = "emails.jsonl"
+LEGACY_EMAILS_FILE = "emails.json"
+
+# Gmail HTTP transport: one keep-alive connection reused across calls
+GMAIL_HTTP_TIMEOUT = 30
+GMAIL_HTTP_CACHE = ".http_cache"
+
+# Gmail rejects batches with more than 100 inner requests
+GMAIL_BATCH_MAX = 100
+GMAIL_BATCH_RETRIES = 5
+RETRYABLE_STATUSES = (429, 500, 503)
+# Max in-flight gets on the non-batch fallback path
+GMAIL_CONCURRENCY = 20
+
+# Load environment (.env) and read Gemini key
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+_GENAI_CONFIGURED = False
 
-if not GEMINI_API_KEY:
-    print("⚠️ GEMINI_API_KEY not set. Add it to your .env file.")
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
-    genai.transport = "rest"
+
+def _genai():
+    """Import the Gemini SDK and configure it on first use."""
+    global _GENAI_CONFIGURED
+    import google.generativeai as genai
+
+    if not _GENAI_CONFIGURED:
+        if not GEMINI_API_KEY:
+            print("⚠️ GEMINI_API_KEY not set. Add it to your .env file.")
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
+            genai.transport = "rest"
+        _GENAI_CONFIGURED = True
+    return genai
 
 
 # ----------------------------------------------------------
 # 1️⃣  Gmail Authentication
 # ----------------------------------------------------------
-def get_gmail_service():
-    """Authenticate user via OAuth, return Gmail API service."""
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+@functools.lru_cache(maxsize=1)
+def _cached_creds():
+    """Credentials from token.json, parsed once per process (None if absent)."""
+    from google.oauth2.credentials import Credentials
+
+    if not os.path.exists("token.json"):
+        return None
+    with open("token.json", "r") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_SH)
+        info = json.load(f)
+    return Credentials.from_authorized_user_info(info, SCOPES)
+
+
+def _write_token(creds):
+    """Rewrite token.json under an exclusive lock so concurrent runs don't interleave."""
+    with open("token.json", "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        f.truncate()
+        f.write(creds.to_json())
+
+
+def get_gmail_credentials():
+    """Authenticate user via OAuth, return valid Gmail credentials."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
+    creds = _cached_creds()
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -51,120 +127,457 @@ def get_gmail_service():
                 )
             flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
             creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+            _cached_creds.cache_clear()
+        _write_token(creds)
+
+    return creds
 
-    return build("gmail", "v1", credentials=creds)
+
+def get_gmail_service(creds=None):
+    """Return Gmail API service (authenticating first if no credentials are given)."""
+    from googleapiclient.discovery import build
+    import google_auth_httplib2
+    import httplib2
+
+    if creds is None:
+        creds = get_gmail_credentials()
+    http = google_auth_httplib2.AuthorizedHttp(
+        creds, http=httplib2.Http(cache=GMAIL_HTTP_CACHE, timeout=GMAIL_HTTP_TIMEOUT)
+    )
+    return build("gmail", "v1", http=http)
 
 
 # ----------------------------------------------------------
 # 2️⃣  Fetch unread emails
 # ----------------------------------------------------------
-def list_unread_emails(service, max_results: int = 10) -> List[Dict]:
-    """Fetch last N unread emails."""
-    results = service.users().messages().list(
-        userId="me", labelIds=["INBOX", "UNREAD"], maxResults=max_results
-    ).execute()
+def _metadata_request(msgs, mid: str):
+    """messages.get for the three headers we keep; fields= trims the rest server-side."""
+    return msgs.get(
+        userId="me",
+        id=mid,
+        format="metadata",
+        metadataHeaders=["From", "Subject", "Date"],
+        fields="id,payload/headers",
+    )
+
+
+def _backoff(attempt: int):
+    """Exponential backoff with jitter between retry rounds, capped at 32s."""
+    time.sleep(min(2 ** attempt + random.random(), 32))
 
-    messages = results.get("messages", [])
-    emails = []
 
-    for m in messages:
-        msg = service.users().messages().get(
+def _batched_messages_get(service, ids: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """Fetch message metadata in batches, retrying only throttled sub-requests.
+
+    Returns (messages by id, ids still failing with a retryable error after the last
+    attempt). Permanent failures (e.g. 404) are reported and appear in neither.
+    """
+    results: Dict[str, Dict] = {}
+    exhausted: List[str] = []
+    msgs = service.users().messages()
+
+    for i in range(0, len(ids), GMAIL_BATCH_MAX):
+        pending = ids[i:i + GMAIL_BATCH_MAX]
+
+        for attempt in range(GMAIL_BATCH_RETRIES):
+            retry_ids: List[str] = []
+
+            def _on_msg(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = response
+                elif isinstance(exception, HttpError) and exception.resp.status in RETRYABLE_STATUSES:
+                    retry_ids.append(request_id)
+                else:
+                    print(f"⚠️ Failed to fetch message {request_id}: {exception}")
+
+            batch = service.new_batch_http_request(callback=_on_msg)
+            for mid in pending:
+                batch.add(_metadata_request(msgs, mid), request_id=mid)
+            batch.execute()
+
+            if not retry_ids:
+                break
+            pending = retry_ids
+            if attempt + 1 < GMAIL_BATCH_RETRIES:
+                _backoff(attempt)
+        else:
+            print(f"⚠️ Gave up on {len(pending)} messages after {GMAIL_BATCH_RETRIES} attempts.")
+            exhausted.extend(pending)
+
+    return results, exhausted
+
+
+_thread_http = threading.local()
+
+
+def _fetch_one(service, creds, mid: str) -> Dict:
+    """Blocking metadata get, on a per-thread transport (httplib2 is not thread-safe)."""
+    http = getattr(_thread_http, "http", None)
+    if http is None:
+        import google_auth_httplib2
+        import httplib2
+
+        http = google_auth_httplib2.AuthorizedHttp(
+            creds, http=httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT)
+        )
+        _thread_http.http = http
+        _thread_http.msgs = service.users().messages()
+    return _metadata_request(_thread_http.msgs, mid).execute(http=http)
+
+
+async def _afetch_one(service, creds, mid: str, sem: asyncio.Semaphore) -> Dict:
+    import asyncio
+
+    async with sem:
+        return await asyncio.to_thread(_fetch_one, service, creds, mid)
+
+
+def _async_messages_get(
+    service, creds, ids: List[str]
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """Fallback when the batch endpoint is unavailable: concurrent single gets.
+
+    Throttled (RETRYABLE_STATUSES) and transport failures are retried with the
+    same backoff as the batch path; returns the same pair as _batched_messages_get.
+    """
+    import asyncio
+    import httplib2
+
+    async def _run(pending):
+        sem = asyncio.Semaphore(GMAIL_CONCURRENCY)
+        return await asyncio.gather(
+            *[_afetch_one(service, creds, mid, sem) for mid in pending], return_exceptions=True
+        )
+
+    results: Dict[str, Dict] = {}
+    pending = ids
+
+    for attempt in range(GMAIL_BATCH_RETRIES):
+        retry_ids: List[str] = []
+        for mid, res in zip(pending, asyncio.run(_run(pending))):
+            if not isinstance(res, Exception):
+                results[mid] = res
+            elif (
+                isinstance(res, HttpError) and res.resp.status in RETRYABLE_STATUSES
+            ) or isinstance(res, (httplib2.HttpLib2Error, OSError)):
+                retry_ids.append(mid)
+            else:
+                print(f"⚠️ Failed to fetch message {mid}: {res}")
+
+        if not retry_ids:
+            break
+        pending = retry_ids
+        if attempt + 1 < GMAIL_BATCH_RETRIES:
+            _backoff(attempt)
+    else:
+        print(f"⚠️ Gave up on {len(pending)} messages after {GMAIL_BATCH_RETRIES} attempts.")
+        return results, pending
+
+    return results, []
+
+
+def _list_unread_ids(service, max_results: int) -> List[str]:
+    """Full listing of the latest INBOX+UNREAD ids, newest first."""
+    messages: List[Dict] = []
+    msgs = service.users().messages()
+    page_token = None
+
+    # list() returns at most 500 ids per page
+    while len(messages) < max_results:
+        results = msgs.list(
+            userId="me",
+            labelIds=["INBOX", "UNREAD"],
+            maxResults=min(max_results - len(messages), 500),
+            pageToken=page_token,
+            fields="messages/id,nextPageToken",
+        ).execute()
+        messages.extend(results.get("messages", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+
+    return [m["id"] for m in messages]
+
+
+def _history_unread_ids(
+    service, start_history_id: str, max_results: int, known_ids=frozenset()
+) -> Tuple[List[str], bool]:
+    """Unread INBOX ids added since start_history_id and not in known_ids, and whether
+    more are left.
+
+    The delta is consumed oldest first in max_results slices, so repeated runs from
+    the same historyId work through it; each slice is returned newest first.
+    """
+    ids: List[str] = []
+    seen = set()
+    history = service.users().history()
+    page_token = None
+
+    while True:
+        results = history.list(
             userId="me",
-            id=m["id"],
-            format="metadata",
-            metadataHeaders=["From", "Subject", "Date"],
+            startHistoryId=start_history_id,
+            historyTypes=["messageAdded"],
+            labelId="UNREAD",
+            pageToken=page_token,
+            fields="history/messagesAdded/message(id,labelIds),nextPageToken",
         ).execute()
-        headers = {h["name"]: h["value"] for h in msg.get("payload", {}).get("headers", [])}
+        for h in results.get("history", []):
+            for added in h.get("messagesAdded", []):
+                msg = added["message"]
+                if msg["id"] not in seen and "INBOX" in msg.get("labelIds", []):
+                    seen.add(msg["id"])
+                    ids.append(msg["id"])
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+
+    # History is oldest first
+    pending = [mid for mid in ids if mid not in known_ids]
+    return pending[:max_results][::-1], len(pending) > max_results
+
+
+def get_history_id(service) -> str:
+    """Current mailbox historyId, used as the start point for the next incremental fetch."""
+    return service.users().getProfile(userId="me", fields="historyId").execute()["historyId"]
+
+
+def _hdr(headers: List[Dict], name: str) -> str:
+    """Value of the first header called name, or "" (metadata responses carry only a few)."""
+    return next((h["value"] for h in headers if h["name"] == name), "")
+
+
+def list_unread_emails(
+    service,
+    creds,
+    max_results: int = 10,
+    start_history_id: str | None = None,
+    known_ids=frozenset(),
+) -> Tuple[List[Dict], bool]:
+    """Fetch last N unread emails (only new ones if start_history_id is given).
+
+    creds are the ones the service was built with; the non-batch fallback needs
+    them to give each worker thread its own transport. known_ids (already archived)
+    are skipped when working through a history delta.
+
+    Returns (emails, complete). complete is False when a history delta was cut by
+    max_results or some messages still failed with a retryable error; the caller
+    must then not advance the saved historyId, or the missed mail would never be
+    picked up. Permanent failures (e.g. deleted between list and get) don't count.
+    """
+    import httplib2
+
+    ids = None
+    truncated = False
+    if start_history_id:
+        try:
+            ids, truncated = _history_unread_ids(
+                service, start_history_id, max_results, known_ids
+            )
+        except HttpError as e:
+            # 404 means the historyId is too old to diff against
+            if e.resp.status != 404:
+                raise
+            print("ℹ️ Saved historyId expired; doing a full fetch.")
+    if ids is None:
+        # "Latest N unread" is the whole contract here, so a capped listing is complete
+        ids = _list_unread_ids(service, max_results)
+
+    if os.environ.get("ASKMYEMAIL_NO_BATCH"):
+        by_id, exhausted = _async_messages_get(service, creds, ids)
+    else:
+        try:
+            by_id, exhausted = _batched_messages_get(service, ids)
+        # A blocked /batch endpoint usually fails in the transport, not as an HttpError
+        except (HttpError, httplib2.HttpLib2Error, OSError) as e:
+            print(f"⚠️ Batch request failed ({e}); falling back to concurrent gets.")
+            by_id, exhausted = _async_messages_get(service, creds, ids)
+    emails = []
+
+    # Keep Gmail's order (newest first)
+    for mid in ids:
+        msg = by_id.get(mid)
+        if msg is None:
+            continue
+        hs = msg.get("payload", {}).get("headers", [])
         emails.append({
-            "id": m["id"],
-            "date": headers.get("Date", ""),
-            "from": headers.get("From", ""),
-            "subject": headers.get("Subject", "(no subject)"),
+            "id": mid,
+            "date": _hdr(hs, "Date"),
+            "from": _hdr(hs, "From"),
+            "subject": _hdr(hs, "Subject") or "(no subject)",
         })
 
-    return emails
+    return emails, not truncated and not exhausted
 
 
 # ----------------------------------------------------------
 # 3️⃣  Save emails locally for memory
 # ----------------------------------------------------------
-def save_emails_to_json(emails: List[Dict], filename: str = "emails.json"):
-    """Save fetched emails locally to avoid refetching every time."""
-    if not emails:
-        print("📭 No new emails to save.")
-        return
+def _state_path(filename: str) -> str:
+    """Sidecar holding fetch state (historyId), e.g. emails.jsonl -> emails.state.json."""
+    return str(Path(filename).with_suffix(".state.json"))
 
-    if os.path.exists(filename):
-        with open(filename, "r") as f:
-            old_data = json.load(f)
-    else:
-        old_data = []
 
-    new_emails = [e for e in emails if e["id"] not in {d["id"] for d in old_data}]
-    if not new_emails:
-        print("✅ All emails already saved.")
+def _migrate_legacy(filename: str):
+    """One-time conversion of the old emails.json array/object into JSONL + state sidecar."""
+    if os.path.exists(filename) or not os.path.exists(LEGACY_EMAILS_FILE):
         return
+    with open(LEGACY_EMAILS_FILE, "rb") as f:
+        data = _loads(f.read())
+    if isinstance(data, list):
+        data = {"historyId": None, "emails": data}
+    with open(filename, "wb") as f:
+        f.writelines(_dumps(e) + b"\n" for e in data.get("emails", []))
+    if data.get("historyId"):
+        _save_history_id(filename, data["historyId"])
+    print(f"📦 Migrated {LEGACY_EMAILS_FILE} to {filename}")
+
+
+def _save_history_id(filename: str, history_id: str):
+    with open(_state_path(filename), "wb") as f:
+        f.write(_dumps({"historyId": history_id}))
 
-    combined = old_data + new_emails
-    with open(filename, "w") as f:
-        json.dump(combined, f, indent=2)
 
-    print(f"💾 Saved {len(new_emails)} new emails to {filename}")
+def _saved_ids(filename: str) -> set:
+    """Ids already in the archive, without building the derived filter fields."""
+    if not os.path.exists(filename):
+        return set()
+    with open(filename, "rb") as f:
+        return {_loads(line)["id"] for line in f if line.strip()}
+
+
+def save_emails_to_json(
+    emails: List[Dict],
+    filename: str = EMAILS_FILE,
+    history_id: str | None = None,
+    seen: set | None = None,
+) -> List[Dict]:
+    """Append newly fetched emails to the local JSONL archive; return the ones written.
+
+    Pass seen (ids already archived) when the caller has loaded the archive anyway.
+    """
+    if seen is None:
+        _migrate_legacy(filename)
+        seen = _saved_ids(filename)
+    new_emails = [e for e in emails if e["id"] not in seen]
+
+    if new_emails:
+        with open(filename, "ab", buffering=1 << 16) as f:
+            f.writelines(_dumps(e) + b"\n" for e in new_emails)
+
+    # Only after the records are on disk, so a failed append can't skip past them
+    if history_id is not None:
+        _save_history_id(filename, history_id)
+
+    if not emails:
+        print("📭 No new emails to save.")
+    elif not new_emails:
+        print("✅ All emails already saved.")
+    else:
+        print(f"💾 Saved {len(new_emails)} new emails to {filename}")
+    return new_emails
 
 
 # ----------------------------------------------------------
 # 4️⃣  Load + Filter saved emails
 # ----------------------------------------------------------
-def load_saved_emails(filename: str = "emails.json"):
+def _to_utc_aware(dt):
+    if not dt:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_cached(date_str: str):
+    """Parse an RFC 2822 Date header to an aware UTC datetime (None if unparseable)."""
+    try:
+        return _to_utc_aware(parsedate_to_datetime(date_str))
+    except (TypeError, ValueError):
+        return None
+
+
+def _prepare_email(e: Dict) -> Dict:
+    """Attach the derived fields filter_emails matches on, once per email."""
+    if "_dt_utc" not in e:
+        e["_dt_utc"] = _parse_cached(e.get("date", ""))
+        e["_from_lc"] = e.get("from", "").lower()
+        e["_subject_lc"] = e.get("subject", "").lower()
+    return e
+
+
+def load_saved_emails(filename: str = EMAILS_FILE):
     """Load previously saved emails."""
+    _migrate_legacy(filename)
     if not os.path.exists(filename):
         return []
-    with open(filename, "r") as f:
-        return json.load(f)
+    with open(filename, "rb") as f:
+        data = [_loads(line) for line in f if line.strip()]
+    for e in data:
+        _prepare_email(e)
+    return data
+
+
+def load_history_id(filename: str = EMAILS_FILE) -> str | None:
+    """historyId recorded by the last successful fetch, if any."""
+    _migrate_legacy(filename)
+    state = _state_path(filename)
+    # Without the archive a saved historyId would only bring back the delta
+    if not os.path.exists(filename) or not os.path.exists(state):
+        return None
+    with open(state, "rb") as f:
+        return _loads(f.read()).get("historyId")
+
+
+def _substring_matcher(needles: str | List[str]) -> Callable[[str], bool]:
+    """Return a predicate that is true when a lowercased string contains any needle."""
+    if isinstance(needles, str):
+        needles = [needles]
+    needles = list(dict.fromkeys(n.lower() for n in needles if n))
+
+    if not needles:
+        return lambda hay: True
+    if len(needles) == 1:
+        n = needles[0]
+        return lambda hay: n in hay
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for n in needles:
+            automaton.add_word(n, n)
+        automaton.make_automaton()
+        return lambda hay: next(automaton.iter(hay), None) is not None
+    return lambda hay: any(n in hay for n in needles)
 
 
 def filter_emails(
     emails,
     since: str | None = None,
-    from_contains: str | None = None,
-    subject_contains: str | None = None,
+    from_contains: str | List[str] | None = None,
+    subject_contains: str | List[str] | None = None,
 ):
-    """Filter emails by date, sender, or subject."""
-    out = emails
-
-    def to_utc_aware(dt):
-        if not dt:
-            return None
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
+    """Filter emails by date, sender, or subject (a list of substrings matches any)."""
+    out = [_prepare_email(e) for e in emails]
 
     if since:
+        from dateutil import parser as dateparser
+
         try:
             since_dt = dateparser.parse(since)
         except Exception:
             since_dt = None
 
         if since_dt:
-            since_dt = to_utc_aware(since_dt)
-
-            def _to_dt(e):
-                try:
-                    return to_utc_aware(dateparser.parse(e.get("date", "")))
-                except Exception:
-                    return None
-
-            out = [e for e in out if (_to_dt(e) and _to_dt(e) >= since_dt)]
+            since_dt = _to_utc_aware(since_dt)
+            out = [e for e in out if (dt := e["_dt_utc"]) is not None and dt >= since_dt]
 
     if from_contains:
-        s = from_contains.lower()
-        out = [e for e in out if s in e.get("from", "").lower()]
+        match = _substring_matcher(from_contains)
+        out = [e for e in out if match(e["_from_lc"])]
 
     if subject_contains:
-        s = subject_contains.lower()
-        out = [e for e in out if s in e.get("subject", "").lower()]
+        match = _substring_matcher(subject_contains)
+        out = [e for e in out if match(e["_subject_lc"])]
 
     return out
 
@@ -172,18 +585,40 @@ def filter_emails(
 # ----------------------------------------------------------
 # 5️⃣  Summarization (optimized for speed)
 # ----------------------------------------------------------
-def summarize_emails_with_gemini(emails, title="Summary of selected emails"):
-    """Summarize email subjects quickly using Gemini Flash."""
-    if not emails:
-        return "No emails matched your filters."
+# Emails per Gemini request; larger selections are summarized chunk-wise then merged
+SUMMARY_CHUNK = 50
+SUMMARY_WORKERS = 8
+DIGEST_MAX_CHARS = 8000
+# Summaries keyed by a hash of their prompts, so unchanged selections aren't re-billed
+SUMMARY_CACHE_DIR = PROJECT_ROOT / ".summary_cache"
+
+_MODEL = None
+
+
+def _model():
+    """Shared Gemini model; its client is safe to use from the chunk worker threads."""
+    global _MODEL
+    _MODEL = _MODEL or _genai().GenerativeModel("gemini-2.0-flash")
+    return _MODEL
 
-    bullet_lines = [
-        f"- {e.get('date','')[:25]} | {e.get('from','')[:60]} | {e.get('subject','')[:140]}"
-        for e in emails[:50]
-    ]
-    digest = "\n".join(bullet_lines)[:8000]
 
-    prompt = f"""
+def _digest(emails) -> str:
+    """One line per email, stopping before the prompt would exceed DIGEST_MAX_CHARS."""
+    buf = io.StringIO()
+    total = 0
+    for e in emails[:SUMMARY_CHUNK]:
+        line = f"- {e.get('date','')[:25]} | {e.get('from','')[:60]} | {e.get('subject','')[:140]}\n"
+        if total + len(line) > DIGEST_MAX_CHARS:
+            break
+        buf.write(line)
+        total += len(line)
+    return buf.getvalue().rstrip("\n")
+
+
+def _prompt(emails) -> str:
+    digest = _digest(emails)
+
+    return f"""
 You are an executive assistant.
 Summarize the following email headers into:
 1) 5–8 concise bullet points describing main themes.
@@ -194,16 +629,106 @@ Emails:
 {digest}
 """
 
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    try:
-        # Set shorter timeout and 1 retry
+
+def _reduce_prompt(partials: List[str]) -> str:
+    joined = "\n\n".join(partials)
+    return f"""
+You are an executive assistant.
+Merge these sub-summaries (each covers a different batch of emails) into one summary:
+1) 5–8 concise bullet points describing main themes.
+2) A short 'Action Items' checklist (✅ style), without duplicates.
+3) Group related emails if possible.
+
+Sub-summaries:
+{joined}
+"""
+
+
+def _generate(model, prompt: str) -> str:
+    # Set shorter timeout and 1 retry
+    resp = model.generate_content(prompt, request_options={"timeout": 60})
+    if not resp or not resp.text:
+        time.sleep(3)
         resp = model.generate_content(prompt, request_options={"timeout": 60})
-        if not resp or not resp.text:
+    return resp.text.strip() if resp and resp.text else ""
+
+
+def _generate_stream(model, prompt: str) -> str:
+    """Like _generate, but echo tokens to stdout as they arrive."""
+    for attempt in range(2):
+        if attempt:
             time.sleep(3)
-            resp = model.generate_content(prompt, request_options={"timeout": 60})
-        return resp.text.strip() if resp and resp.text else "No summary generated."
+        pieces = []
+        resp = model.generate_content(prompt, stream=True, request_options={"timeout": 60})
+        for chunk in resp:
+            try:
+                text = chunk.text
+            except ValueError:  # chunk without text parts (e.g. safety stop)
+                continue
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            pieces.append(text)
+        if pieces:
+            return "".join(pieces).strip()
+    return ""
+
+
+def summarize_emails_with_gemini(emails, title="Summary of selected emails", stream: bool = False):
+    """Summarize email subjects quickly using Gemini Flash.
+
+    With stream=True the summary (or any fallback message) is also written to
+    stdout as it is produced.
+    """
+
+    def _done(text: str) -> str:
+        if stream:
+            print(text)
+        return text
+
+    if not emails:
+        return _done("No emails matched your filters.")
+
+    chunks = [emails[i:i + SUMMARY_CHUNK] for i in range(0, len(emails), SUMMARY_CHUNK)]
+    prompts = [_prompt(c) for c in chunks]
+
+    # Same prompts -> same summary; skip the Gemini call entirely
+    key = hashlib.blake2b("\0".join(prompts).encode(), digest_size=16).hexdigest()
+    cached = Path(SUMMARY_CACHE_DIR) / f"{key}.md"
+    if cached.exists():
+        return _done(cached.read_text(encoding="utf-8"))
+
+    final = _generate_stream if stream else _generate
+    covers_all = True
+    try:
+        model = _model()
+        if len(prompts) == 1:
+            summary = final(model, prompts[0])
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(SUMMARY_WORKERS, len(prompts))) as ex:
+                partials = list(ex.map(lambda p: _generate(model, p), prompts))
+            # An empty chunk means the merged summary leaves those emails out
+            covers_all = all(partials)
+            partials = [p for p in partials if p]
+            summary = final(model, _reduce_prompt(partials)) if partials else ""
     except Exception as e:
-        return f"⚠️ Gemini summarization failed: {e}"
+        return _done(f"⚠️ Gemini summarization failed: {e}")
+
+    if not summary:
+        return _done("No summary generated.")
+    if stream:
+        print()
+    if not covers_all:
+        print("⚠️ Some email chunks returned no summary; not caching this result.")
+        return summary
+
+    try:
+        cached.parent.mkdir(exist_ok=True)
+        cached.write_text(summary, encoding="utf-8")
+    except OSError as e:
+        print(f"⚠️ Failed to cache summary: {e}")
+    return summary
 
 
 
@@ -212,20 +737,37 @@ Emails:
 # ----------------------------------------------------------
 def main():
     parser = argparse.ArgumentParser(description="AskMyEmail — fetch & summarize Gmail")
-    parser.add_argument("--fetch", action="store_true", help="Fetch unread emails and save to emails.json")
+    parser.add_argument("--fetch", action="store_true", help="Fetch unread emails and save to emails.jsonl")
     parser.add_argument("--max", type=int, default=10, help="Max unread emails to fetch")
     parser.add_argument("--since", type=str, default=None, help='Filter saved emails since (e.g. "2025-10-01")')
-    parser.add_argument("--from-contains", type=str, default=None, help="Filter by sender substring")
-    parser.add_argument("--subject-contains", type=str, default=None, help="Filter by subject substring")
+    parser.add_argument("--from-contains", type=str, action="append", default=None, help="Filter by sender substring (repeatable, matches any)")
+    parser.add_argument("--subject-contains", type=str, action="append", default=None, help="Filter by subject substring (repeatable, matches any)")
     parser.add_argument("--summary", action="store_true", help="Summarize filtered emails with Gemini")
 
     args = parser.parse_args()
 
+    # Read the archive once; a fetch only appends to it
+    saved = load_saved_emails()
+
     # --- Step 1: Fetch from Gmail ---
     if args.fetch:
         print("🔐 Connecting to Gmail (read-only)…")
-        service = get_gmail_service()
-        emails = list_unread_emails(service, max_results=args.max)
+        creds = get_gmail_credentials()
+        service = get_gmail_service(creds)
+        # Taken before listing so nothing arriving mid-fetch is skipped next time
+        history_id = get_history_id(service)
+        saved_ids = {e["id"] for e in saved}
+        emails, complete = list_unread_emails(
+            service,
+            creds,
+            max_results=args.max,
+            start_history_id=load_history_id(),
+            known_ids=saved_ids,
+        )
+        if not complete:
+            # Keep the old historyId so the next run sees the skipped mail again
+            print("ℹ️ Not all new mail was fetched; run again (or raise --max) to get the rest.")
+            history_id = None
 
         if not emails:
             print("✅ No unread emails 🎉")
@@ -233,10 +775,11 @@ def main():
             print("\n📬 Latest unread emails:")
             for e in emails:
                 print(f"- {e['date']} | {e['from']} — {e['subject']}")
-        save_emails_to_json(emails)
+        saved.extend(
+            save_emails_to_json(emails, history_id=history_id, seen=saved_ids)
+        )
 
     # --- Step 2: Filter ---
-    saved = load_saved_emails()
     filtered = filter_emails(
         saved,
         since=args.since,
@@ -248,24 +791,20 @@ def main():
 
     # --- Step 3: Summarize ---
     if args.summary:
-        print("\n🧠 Generating summary with Gemini (1.5-flash)…")
-        summary = summarize_emails_with_gemini(filtered)
-        print("\n" + summary + "\n")
+        print("\n🧠 Generating summary with Gemini (1.5-flash)…\n")
+        summary = summarize_emails_with_gemini(filtered, stream=True)
+        print()
 
-        # Save to summary.md
         # --- Save summary to project root, no matter where you ran the script from
-    PROJECT_ROOT = Path(__file__).resolve().parent.parent
-    OUT_PATH = PROJECT_ROOT / "summary.md"
-
-    try:
-        text = summary if (summary and summary.strip()) else "No summary generated."
-        OUT_PATH.write_text(text, encoding="utf-8")
-        print(f"📝 Summary saved to: {OUT_PATH}")
-    except Exception as e:
-        print(f"⚠️ Failed to write summary: {e}")
-        print(f"cwd was: {os.getcwd()}  | intended path: {OUT_PATH}")
-
+        OUT_PATH = PROJECT_ROOT / "summary.md"
 
+        try:
+            text = summary if (summary and summary.strip()) else "No summary generated."
+            OUT_PATH.write_text(text, encoding="utf-8")
+            print(f"📝 Summary saved to: {OUT_PATH}")
+        except Exception as e:
+            print(f"⚠️ Failed to write summary: {e}")
+            print(f"cwd was: {os.getcwd()}  | intended path: {OUT_PATH}")
 
 
 if __name__ == "__main__":